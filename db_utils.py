@@ -5,100 +5,303 @@ Author: That Zin Aung
 Date: 2025-12-03
 """
 
+import atexit
+import collections
+import json
 import sqlite3
+import threading
 from typing import List, Tuple, Optional
 
 DB_NAME = "books.db"
 
+# The database is small, so it is loaded into an in-memory copy on first
+# use. All queries run against the copy; writes are flushed back to the
+# file shortly after they happen and again at exit.
+# Writers and flush_db() hold _CONN_LOCK, so a flush never runs while a
+# write transaction is open.
+_CONN: Optional[sqlite3.Connection] = None
+_DISK_CONN: Optional[sqlite3.Connection] = None
+_CONN_LOCK = threading.Lock()
 
-def get_connection():
+# Seconds to wait after a write before flushing to disk, so a burst of
+# writes costs a single flush.
+_FLUSH_DELAY = 2.0
+_FLUSH_TIMER: Optional[threading.Timer] = None
+_DIRTY = False
+
+# Books found by get_book_and_top_words(), keyed by (title, n). Cleared on
+# every write so it never returns stale data.
+_BOOK_CACHE = collections.OrderedDict()
+_BOOK_CACHE_SIZE = 64
+
+# Size of the sqlite3 prepared-statement cache for the shared connection.
+_CACHED_STATEMENTS = 256
+
+# Applied once when the on-disk connection is opened.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def get_connection() -> sqlite3.Connection:
     """
-    Opens a connection to the SQLite database.
+    Returns the shared connection to the in-memory copy of the database,
+    loading it from DB_NAME on first use.
 
     Returns:
-        sqlite3.Connection: An open connection to the database.
+        sqlite3.Connection: The open connection to the database.
+    """
+    global _CONN, _DISK_CONN
+    with _CONN_LOCK:
+        if _CONN is None:
+            _DISK_CONN = sqlite3.connect(DB_NAME, check_same_thread=False)
+            for pragma in _PRAGMAS:
+                _DISK_CONN.execute(pragma)
+            _CONN = sqlite3.connect(
+                ":memory:",
+                check_same_thread=False,
+                cached_statements=_CACHED_STATEMENTS,
+            )
+            _DISK_CONN.backup(_CONN)
+            atexit.register(close_connection)
+        return _CONN
+
+
+def flush_db():
+    """
+    Writes the in-memory database back to DB_NAME if it has changed
+    since the last flush.
+    """
+    global _FLUSH_TIMER, _DIRTY
+    with _CONN_LOCK:
+        if _FLUSH_TIMER is not None:
+            _FLUSH_TIMER.cancel()
+            _FLUSH_TIMER = None
+        if _CONN is not None and _DIRTY:
+            _CONN.backup(_DISK_CONN)
+            _DIRTY = False
+
+
+def _schedule_flush():
+    """
+    Marks the database as changed and schedules flush_db() to run after
+    _FLUSH_DELAY seconds, replacing any flush that is already pending.
+    """
+    global _FLUSH_TIMER, _DIRTY
+    with _CONN_LOCK:
+        _DIRTY = True
+        if _FLUSH_TIMER is not None:
+            _FLUSH_TIMER.cancel()
+        _FLUSH_TIMER = threading.Timer(_FLUSH_DELAY, flush_db)
+        _FLUSH_TIMER.daemon = True
+        _FLUSH_TIMER.start()
+
+
+def close_connection():
+    """
+    Flushes pending writes and closes the shared connections if open.
     """
-    return sqlite3.connect(DB_NAME)
+    global _CONN, _DISK_CONN
+    flush_db()
+    with _CONN_LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _DISK_CONN.close()
+            _CONN = None
+            _DISK_CONN = None
+
+
+# Title is compared case-insensitively, so lookups can use its unique index.
+_CREATE_BOOKS = """
+    CREATE TABLE {if_not_exists}books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT UNIQUE NOT NULL COLLATE NOCASE,
+        url TEXT,
+        top_words TEXT
+    )
+"""
 
 
 def init_db():
     """
-    Creates the required tables if they do not exist.
+    Creates the required tables if they do not exist, and migrates
+    databases that use an older schema.
     """
     conn = get_connection()
-    try:
-        cur = conn.cursor()
+    with _CONN_LOCK:
+        # sqlite3 only opens transactions implicitly before DML, so the
+        # schema changes run in an explicit one and roll back together.
+        isolation_level = conn.isolation_level
+        conn.isolation_level = None
+        try:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                changed = _create_or_migrate_schema(cur)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        finally:
+            conn.isolation_level = isolation_level
+
+    if changed:
+        _BOOK_CACHE.clear()
+        _schedule_flush()
+
+
+def _create_or_migrate_schema(cur: sqlite3.Cursor) -> bool:
+    """
+    Creates the books table, or brings an existing one up to date.
+
+    Args:
+        cur: Cursor inside the init_db() transaction.
+
+    Returns:
+        True if the database was changed.
+    """
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'books'")
+    changed = cur.fetchone() is None
+    cur.execute(_CREATE_BOOKS.format(if_not_exists="IF NOT EXISTS "))
+
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(books)")]
+    if "top_words" not in columns:
+        cur.execute("ALTER TABLE books ADD COLUMN top_words TEXT")
+        changed = True
+
+    cur.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name = 'word_freqs'
+    """)
+    if cur.fetchone() is not None:
+        _migrate_word_freqs(cur)
+        changed = True
+
+    cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'books'")
+    if "COLLATE NOCASE" not in cur.fetchone()[0].upper():
+        _migrate_title_nocase(cur)
+        changed = True
+
+    return changed
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT UNIQUE NOT NULL,
-                url TEXT
-            )
-        """)
 
+def _migrate_word_freqs(cur: sqlite3.Cursor):
+    """
+    Copies rows from the old word_freqs table into books.top_words and
+    drops the old table.
+
+    Args:
+        cur: Cursor inside the init_db() transaction.
+    """
+    book_ids = [row[0] for row in cur.execute("SELECT id FROM books")]
+    for book_id in book_ids:
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS word_freqs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                book_id INTEGER NOT NULL,
-                word TEXT NOT NULL,
-                frequency INTEGER NOT NULL,
-                UNIQUE(book_id, word),
-                FOREIGN KEY(book_id) REFERENCES books(id) ON DELETE CASCADE
-            )
-        """)
+            SELECT word, frequency
+            FROM word_freqs
+            WHERE book_id = ?
+        """, (book_id,))
+        cur.execute(
+            "UPDATE books SET top_words = ? WHERE id = ?",
+            (_encode_top_words(cur.fetchall()), book_id),
+        )
+    cur.execute("DROP TABLE word_freqs")
 
-        conn.commit()
-    finally:
-        conn.close()
+
+def _migrate_title_nocase(cur: sqlite3.Cursor):
+    """
+    Rebuilds the books table so title uses COLLATE NOCASE. If two old
+    titles differ only by case, the older row is kept.
+
+    Args:
+        cur: Cursor inside the init_db() transaction.
+    """
+    cur.execute("ALTER TABLE books RENAME TO books_old")
+    cur.execute(_CREATE_BOOKS.format(if_not_exists=""))
+    cur.execute("""
+        INSERT OR IGNORE INTO books (id, title, url, top_words)
+        SELECT id, title, url, top_words
+        FROM books_old
+        ORDER BY id
+    """)
+    cur.execute("DROP TABLE books_old")
 
 
-def get_book_by_title(title: str) -> Optional[Tuple[int, str, str]]:
+def _encode_top_words(word_freqs: List[Tuple[str, int]]) -> str:
     """
-    Retrieves a book from the database by title (case-insensitive).
+    Serializes word frequencies for the books.top_words column.
 
     Args:
-        title: Title of the book to search for.
+        word_freqs: List of (word, frequency) tuples.
 
     Returns:
-        A tuple (id, title, url) if found, otherwise None.
+        JSON list of [word, frequency] pairs sorted by frequency
+        descending, then word ascending.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, title, url
-            FROM books
-            WHERE LOWER(title) = LOWER(?)
-        """, (title,))
-        row = cur.fetchone()
-        return row
-    finally:
-        conn.close()
+    ordered = sorted(word_freqs, key=lambda wf: (-wf[1], wf[0]))
+    return json.dumps(ordered, separators=(",", ":"))
 
 
-def get_word_frequencies(book_id: int) -> List[Tuple[str, int]]:
+def _decode_top_words(data: Optional[str]) -> List[Tuple[str, int]]:
     """
-    Retrieves the word frequencies for a given book.
+    Deserializes a books.top_words value.
 
     Args:
-        book_id: ID of the book.
+        data: JSON text from the column, or None.
 
     Returns:
-        List of (word, frequency) tuples sorted by frequency descending.
+        List of (word, frequency) tuples.
     """
+    if not data:
+        return []
+    return [(word, freq) for word, freq in json.loads(data)]
+
+
+def get_book_and_top_words(
+    title: str, n: int = 10
+) -> Optional[Tuple[int, str, str, List[Tuple[str, int]]]]:
+    """
+    Retrieves a book and its top word frequencies in a single query.
+
+    Args:
+        title: Title of the book to search for (case-insensitive).
+        n: Maximum number of words to return.
+
+    Returns:
+        A tuple (id, title, url, word_freqs) if the book is stored with
+        word data, otherwise None. word_freqs is a list of
+        (word, frequency) tuples sorted by frequency descending.
+        Found books are cached until the next write.
+    """
+    key = (title, n)
+    cached = _BOOK_CACHE.get(key)
+    if cached is not None:
+        _BOOK_CACHE.move_to_end(key)
+        return cached[0], cached[1], cached[2], list(cached[3])
+
     conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT word, frequency
-            FROM word_freqs
-            WHERE book_id = ?
-            ORDER BY frequency DESC, word ASC
-        """, (book_id,))
-        return cur.fetchall()
-    finally:
-        conn.close()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, title, url, top_words
+        FROM books
+        WHERE title = ?
+    """, (title,))
+    row = cur.fetchone()
+
+    if row is None:
+        return None
+
+    word_freqs = _decode_top_words(row[3])[:n]
+    if not word_freqs:
+        return None
+
+    _BOOK_CACHE[key] = (row[0], row[1], row[2], word_freqs)
+    if len(_BOOK_CACHE) > _BOOK_CACHE_SIZE:
+        _BOOK_CACHE.popitem(last=False)
+    return row[0], row[1], row[2], list(word_freqs)
 
 
 def insert_or_update_book(title: str, url: str, word_freqs: List[Tuple[str, int]]):
@@ -111,32 +314,14 @@ def insert_or_update_book(title: str, url: str, word_freqs: List[Tuple[str, int]
         word_freqs: List of (word, frequency) tuples to store.
     """
     conn = get_connection()
-    try:
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO books (title, url)
-            VALUES (?, ?)
-            ON CONFLICT(title) DO UPDATE SET url = excluded.url
-        """, (title, url))
-        conn.commit()
-
-        # Get the book id
-        cur.execute("SELECT id FROM books WHERE title = ?", (title,))
-        book_id_row = cur.fetchone()
-        if book_id_row is None:
-            return
-        book_id = book_id_row[0]
-
-        # Clear old word frequencies for this book
-        cur.execute("DELETE FROM word_freqs WHERE book_id = ?", (book_id,))
-
-        # Insert new word frequencies
-        cur.executemany("""
-            INSERT INTO word_freqs (book_id, word, frequency)
+    with _CONN_LOCK, conn:
+        conn.execute("""
+            INSERT INTO books (title, url, top_words)
             VALUES (?, ?, ?)
-        """, [(book_id, w, f) for w, f in word_freqs])
+            ON CONFLICT(title) DO UPDATE SET
+                url = excluded.url,
+                top_words = excluded.top_words
+        """, (title, url, _encode_top_words(word_freqs)))
 
-        conn.commit()
-    finally:
-        conn.close()
+    _BOOK_CACHE.clear()
+    _schedule_flush()
@@ -5,6 +5,7 @@ Author: That Zin Aung
 Date: 2025-12-03
 """
 
+import concurrent.futures
 import tkinter as tk
 from tkinter import ttk, messagebox
 
@@ -12,14 +13,12 @@ import requests
 
 from db_utils import (
     init_db,
-    get_book_by_title,
-    get_word_frequencies,
+    flush_db,
+    get_book_and_top_words,
     insert_or_update_book,
 )
 from text_utils import (
-    fetch_book_text,
-    extract_title,
-    compute_top_words,
+    fetch_book_top_words,
     search_gutenberg_by_title,
 )
 
@@ -39,6 +38,10 @@ class GutenbergApp:
         """
         self.root = root
         self.root.title("Project Gutenberg Word Frequency Tool")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Network and word counting run here so the GUI stays responsive
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
 
         # --- Top frame: search by title ---
         frame_title = ttk.LabelFrame(root, text="Search by Book Title (Local DB + WWW API)")
@@ -90,40 +93,7 @@ class GutenbergApp:
             return
 
         self.clear_results()
-
-        try:
-            # 1. Try local database
-            book = get_book_by_title(title)
-            if book is not None:
-                book_id, stored_title, _url = book
-                word_freqs = get_word_frequencies(book_id)
-                if word_freqs:
-                    self.show_results(word_freqs[:10])
-                    self.set_status(f"Loaded '{stored_title}' from local database.")
-                    return
-
-            # 2. Not in DB or no word data → use WWW API
-            text_url = search_gutenberg_by_title(title)
-            if not text_url:
-                self.set_status("Book was not found.")
-                messagebox.showinfo("Info", "Book was not found.")
-                return
-
-            # 3. Fetch text, compute top words, store in DB
-            text = fetch_book_text(text_url)
-            book_title = extract_title(text)
-            top_words = compute_top_words(text, n=10)
-
-            insert_or_update_book(book_title, text_url, top_words)
-            self.show_results(top_words)
-            self.set_status(f"Retrieved '{book_title}' from the web and stored it.")
-
-        except requests.RequestException as exc:
-            self.set_status(f"Network error: {exc}")
-            messagebox.showerror("Network Error", str(exc))
-        except Exception as exc:
-            self.set_status(f"Error: {exc}")
-            messagebox.showerror("Error", str(exc))
+        self.run_in_background(self.search_title, title)
 
     def on_search_url(self):
         """
@@ -135,22 +105,101 @@ class GutenbergApp:
             return
 
         self.clear_results()
+        self.run_in_background(self.search_url, url)
 
-        try:
-            text = fetch_book_text(url)
-            book_title = extract_title(text)
-            top_words = compute_top_words(text, n=10)
+    def on_close(self):
+        """
+        Handles closing the main window.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        flush_db()
+        self.root.destroy()
+
+    # ----------------- Background Jobs -----------------
+
+    def search_title(self, title: str):
+        """
+        Looks up a book by title, first in the local database and then
+        through the WWW API. Runs on a worker thread.
+
+        Args:
+            title: Book title to search for.
 
-            insert_or_update_book(book_title, url, top_words)
-            self.show_results(top_words)
-            self.set_status(f"Stored/updated '{book_title}' from URL.")
+        Returns:
+            A tuple (word_freqs, status). word_freqs is None if the book
+            was not found.
+        """
+        # 1. Try local database
+        book = get_book_and_top_words(title, n=10)
+        if book is not None:
+            _book_id, stored_title, _url, word_freqs = book
+            return word_freqs, f"Loaded '{stored_title}' from local database."
+
+        # 2. Not in DB or no word data → use WWW API
+        text_url = search_gutenberg_by_title(title)
+        if not text_url:
+            return None, "Book was not found."
+
+        # 3. Fetch text, compute top words, store in DB
+        book_title, top_words = fetch_book_top_words(text_url, n=10)
+
+        insert_or_update_book(book_title, text_url, top_words)
+        return top_words, f"Retrieved '{book_title}' from the web and stored it."
+
+    def search_url(self, url: str):
+        """
+        Fetches a book from a URL and stores its top words. Runs on a
+        worker thread.
 
+        Args:
+            url: Project Gutenberg URL of the plain-text book.
+
+        Returns:
+            A tuple (word_freqs, status).
+        """
+        book_title, top_words = fetch_book_top_words(url, n=10)
+
+        insert_or_update_book(book_title, url, top_words)
+        return top_words, f"Stored/updated '{book_title}' from URL."
+
+    def run_in_background(self, job, *args):
+        """
+        Runs a job on the worker pool and reports its result back on the
+        Tk main thread. The search buttons are disabled until it finishes.
+
+        Args:
+            job: Callable returning a (word_freqs, status) tuple.
+            *args: Arguments passed to job.
+        """
+        self.set_busy(True)
+        self.set_status("Working...")
+        future = self._pool.submit(job, *args)
+        future.add_done_callback(lambda fut: self.root.after(0, self.on_job_done, fut))
+
+    def on_job_done(self, future):
+        """
+        Displays the result of a finished background job.
+
+        Args:
+            future: The completed concurrent.futures.Future.
+        """
+        self.set_busy(False)
+        try:
+            word_freqs, status = future.result()
         except requests.RequestException as exc:
             self.set_status(f"Network error: {exc}")
             messagebox.showerror("Network Error", str(exc))
+            return
         except Exception as exc:
             self.set_status(f"Error: {exc}")
             messagebox.showerror("Error", str(exc))
+            return
+
+        self.set_status(status)
+        if word_freqs is None:
+            messagebox.showinfo("Info", status)
+        else:
+            self.show_results(word_freqs)
 
     # ----------------- Helper Methods -----------------
 
@@ -165,6 +214,17 @@ class GutenbergApp:
         for word, freq in word_freqs:
             self.tree.insert("", "end", values=(word, freq))
 
+    def set_busy(self, busy: bool):
+        """
+        Enables or disables the search buttons while a job is running.
+
+        Args:
+            busy: True to disable the buttons, False to enable them.
+        """
+        state = "disabled" if busy else "normal"
+        self.search_title_btn.config(state=state)
+        self.search_url_btn.config(state=state)
+
     def clear_results(self):
         """Clears the Treeview results."""
         for item in self.tree.get_children():
@@ -5,39 +5,137 @@ Author: That Zin Aung
 Date: 2025-12-03
 """
 
-import re
 import collections
+import functools
 from typing import List, Tuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import quote_plus
+from urllib3.util.retry import Retry
 
 # Simple stopword list – you can expand this if you want.
-STOPWORDS = {
+STOPWORDS = frozenset({
     "the", "a", "an", "and", "or", "but", "if", "in", "on", "at", "to",
     "of", "for", "with", "without", "from", "by",
     "i", "you", "he", "she", "it", "we", "they",
     "this", "that", "these", "those", "is", "are", "was", "were", "be",
     "as", "so", "than", "then", "there", "here",
-}
+})
+
+# Shared HTTP session so Gutendex and book downloads reuse keep-alive
+# connections instead of a new TCP + TLS handshake per request.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Results of fetch_book_top_words() keyed by (url, n), so fetching the same
+# book again skips the download and tokenization.
+_TOP_WORDS_CACHE = collections.OrderedDict()
+_TOP_WORDS_CACHE_SIZE = 32
+
+# Byte translation table that lowercases A-Z, keeps [a-z'] and turns
+# everything else into a space, so bytes.split() yields the same tokens as
+# re.findall(r"[a-z']+", text.lower()) without a separate lower() pass.
+_WORD_TABLE = bytes.maketrans(
+    bytes(range(256)),
+    bytes(
+        c + 32 if 65 <= c <= 90 else c if (97 <= c <= 122 or c == 39) else 32
+        for c in range(256)
+    ),
+)
+_WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz'")
+# Characters that can continue a token in not-yet-lowercased text.
+_TOKEN_CHARS = _WORD_CHARS | frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# Byte tokens never reported: stopwords and every one-character token.
+_DROPPED_TOKENS = frozenset(w.encode("ascii") for w in STOPWORDS) | frozenset(
+    c.encode("ascii") for c in _WORD_CHARS
+)
+
+# Streaming download chunk size, and how much of the book's header
+# extract_title() looks at.
+_CHUNK_SIZE = 65536
+_HEADER_LINES = 60
+_HEADER_CHARS = 16384
+
+
+def fetch_book_top_words(url: str, n: int = 10) -> Tuple[str, List[Tuple[str, int]]]:
+    """
+    Streams a Project Gutenberg book and counts its words chunk by chunk,
+    so the full text is never held in memory. Results are cached per
+    (url, n).
 
+    Args:
+        url: The URL of the plain-text book.
+        n: Number of top words to return.
 
-def fetch_book_text(url: str) -> str:
+    Returns:
+        A tuple (title, word_freqs) where word_freqs is a list of
+        (word, frequency) tuples.
+
+    Raises:
+        requests.RequestException: If the HTTP request fails.
+    """
+    key = (url, n)
+    cached = _TOP_WORDS_CACHE.get(key)
+    if cached is not None:
+        _TOP_WORDS_CACHE.move_to_end(key)
+        return cached[0], list(cached[1])
+
+    title, top_words = _stream_top_words(url, n)
+    _TOP_WORDS_CACHE[key] = (title, top_words)
+    if len(_TOP_WORDS_CACHE) > _TOP_WORDS_CACHE_SIZE:
+        _TOP_WORDS_CACHE.popitem(last=False)
+    return title, list(top_words)
+
+
+def _stream_top_words(url: str, n: int) -> Tuple[str, List[Tuple[str, int]]]:
     """
-    Downloads the text from a Project Gutenberg URL.
+    Downloads a book in chunks and counts its words as they arrive.
 
     Args:
         url: The URL of the plain-text book.
+        n: Number of top words to return.
 
     Returns:
-        The text content as a string.
+        A tuple (title, word_freqs).
 
     Raises:
         requests.RequestException: If the HTTP request fails.
     """
-    response = requests.get(url, timeout=15)
-    response.raise_for_status()
-    return response.text
+    counter = collections.Counter()
+    header = []
+    header_lines = 0
+    header_chars = 0
+    tail = ""
+
+    with _SESSION.get(url, stream=True, timeout=15) as response:
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = "utf-8"
+
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE, decode_unicode=True):
+            if header_lines < _HEADER_LINES and header_chars < _HEADER_CHARS:
+                header.append(chunk)
+                header_lines += chunk.count("\n")
+                header_chars += len(chunk)
+
+            # Hold back a word that may continue in the next chunk
+            chunk = tail + chunk
+            cut = len(chunk)
+            while cut and chunk[cut - 1] in _TOKEN_CHARS:
+                cut -= 1
+            tail = chunk[cut:]
+            counter.update(_tokenize(chunk[:cut]))
+
+    counter.update(_tokenize(tail))
+    return extract_title("".join(header)), _most_common_words(counter, n)
 
 
 def extract_title(text: str) -> str:
@@ -50,10 +148,11 @@ def extract_title(text: str) -> str:
     Returns:
         A best-guess title string.
     """
-    lines = text.splitlines()
-    for line in lines[:60]:
+    # Titles live in the header, so only split the first few KB into lines
+    lines = text[:_HEADER_CHARS].splitlines()[:_HEADER_LINES]
+    for line in lines:
         line = line.strip()
-        if line.upper().startswith("TITLE:"):
+        if line[:6].upper() == "TITLE:":
             return line[6:].strip()
 
     # fallback: first non-empty line
@@ -63,25 +162,41 @@ def extract_title(text: str) -> str:
     return "Unknown Title"
 
 
-def compute_top_words(text: str, n: int = 10) -> List[Tuple[str, int]]:
+def _tokenize(text: str) -> List[bytes]:
+    """
+    Splits text into lowercase [a-z'] runs using a byte translation table.
+
+    Non-ASCII characters are encoded as '?' and so act as separators.
+
+    Args:
+        text: Text to tokenize.
+
+    Returns:
+        List of ASCII-encoded tokens.
+    """
+    return text.encode("ascii", "replace").translate(_WORD_TABLE).split()
+
+
+def _most_common_words(counter: collections.Counter, n: int) -> List[Tuple[str, int]]:
     """
-    Computes the n most frequent non-stopword words in the provided text.
+    Drops stopwords and single letters from a counter of byte tokens and
+    returns the n most frequent remaining words.
 
     Args:
-        text: The book text.
+        counter: Counter of tokens from _tokenize(); modified in place.
         n: Number of top words to return.
 
     Returns:
         List of (word, frequency) tuples.
     """
-    text = text.lower()
-    tokens = re.findall(r"[a-z']+", text)
-    filtered = [t for t in tokens if t not in STOPWORDS and len(t) > 1]
-
-    counter = collections.Counter(filtered)
-    return counter.most_common(n)
+    # A fixed set of pops is cheaper than scanning the whole vocabulary,
+    # and only the n winners need decoding.
+    for token in _DROPPED_TOKENS:
+        counter.pop(token, None)
+    return [(token.decode("ascii"), count) for token, count in counter.most_common(n)]
 
 
+@functools.lru_cache(maxsize=128)
 def search_gutenberg_by_title(title: str) -> Optional[str]:
     """
     Uses a WWW API (Gutendex) to search Project Gutenberg by title.
@@ -101,7 +216,7 @@ def search_gutenberg_by_title(title: str) -> Optional[str]:
     query = quote_plus(title)
     url = f"https://gutendex.com/books?search={query}"
 
-    response = requests.get(url, timeout=10)
+    response = _SESSION.get(url, timeout=10)
     response.raise_for_status()
     data = response.json()
 